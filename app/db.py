@@ -1,27 +1,59 @@
 """Database configuration and session management."""
 
+import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
-from sqlalchemy import text
+from pgvector.asyncpg import register_vector
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 # SQLAlchemy Base
 Base = declarative_base()
 
+# HNSW index on chunk embeddings; earlier versions indexed cosine distance
+VECTOR_INDEX_NAME = "document_chunks_embedding_hnsw_ip"
+LEGACY_VECTOR_INDEX_NAME = "document_chunks_embedding_hnsw"
+
+# HNSW index on binary-quantized embeddings, built when binary_rerank is on
+BINARY_VECTOR_INDEX_NAME = "document_chunks_embedding_bit_hnsw"
+
+# HNSW index build state: pending, building, ready or failed: <error>
+vector_index_status = "pending"
+
 # Async engine for database operations
 async_engine = create_async_engine(
     settings.database_async_url,
     echo=settings.debug,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    pool_timeout=settings.db_pool_timeout,
+    connect_args={
+        "statement_cache_size": settings.db_statement_cache_size,
+        "prepared_statement_cache_size": settings.db_prepared_statement_cache_size,
+    },
 )
 
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _register_vector_codec(dbapi_connection, connection_record):
+    """Register pgvector's binary codecs so embeddings are sent as raw floats."""
+    try:
+        dbapi_connection.run_async(register_vector)
+    except ValueError as e:
+        # The vector extension does not exist yet; init_db creates it and
+        # then resets the pool so later connections get the codec
+        logger.info(f"pgvector codec not registered: {e}")
+
+
 # Async session factory
 AsyncSessionLocal = async_sessionmaker(
     async_engine,
@@ -50,6 +82,166 @@ async def init_db():
         # Create tables
         await conn.run_sync(Base.metadata.create_all)
 
+        # Hash partitions for document_chunks
+        await _create_chunk_partitions(conn)
+
+        # Convert embeddings stored by earlier versions as FP32 vector
+        await _migrate_embedding_to_halfvec(conn)
+
+        # Tables created by earlier versions filled timestamps client-side
+        await _set_timestamp_defaults(conn)
+
+    # Connections opened before the extension existed lack the vector codec
+    await async_engine.dispose()
+
+
+async def _chunk_partitions(conn) -> list[str]:
+    """Return partition names of document_chunks, empty if it is not partitioned."""
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'document_chunks'::regclass "
+        "ORDER BY c.relname"
+    ))
+    return list(result.scalars().all())
+
+
+async def _create_chunk_partitions(conn):
+    """Create the hash partitions of document_chunks if they do not exist."""
+    result = await conn.execute(text(
+        "SELECT relkind FROM pg_class WHERE oid = 'document_chunks'::regclass"
+    ))
+    if result.scalar_one() != "p":
+        # Tables created by earlier versions are not partitioned and stay as-is
+        logger.warning("document_chunks is not partitioned; recreate it to enable partitioning")
+        return
+
+    modulus = settings.chunk_partitions
+    existing = await _chunk_partitions(conn)
+    if existing and len(existing) != modulus:
+        # A different modulus would overlap the existing partitions
+        logger.warning(
+            f"document_chunks has {len(existing)} partitions but chunk_partitions is "
+            f"{modulus}; keeping the existing partitions"
+        )
+        return
+
+    for remainder in range(modulus):
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS document_chunks_p{remainder} "
+            f"PARTITION OF document_chunks "
+            f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+        ))
+
+
+async def _migrate_embedding_to_halfvec(conn):
+    """Convert a legacy vector embedding column to halfvec in place."""
+    result = await conn.execute(text(
+        "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+        "WHERE attrelid = 'document_chunks'::regclass AND attname = 'embedding'"
+    ))
+    column_type = result.scalar_one_or_none()
+
+    if column_type and column_type.startswith("vector"):
+        dim = settings.vector_dimension
+        # Indexes on the vector column cannot survive the type change
+        await conn.execute(text(f"DROP INDEX IF EXISTS {LEGACY_VECTOR_INDEX_NAME}"))
+        await conn.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}"))
+        await conn.execute(text(
+            f"ALTER TABLE document_chunks ALTER COLUMN embedding "
+            f"TYPE halfvec({dim}) USING embedding::halfvec({dim})"
+        ))
+
+
+async def _set_timestamp_defaults(conn):
+    """Add now() server defaults to timestamp columns of existing tables that lack one."""
+    result = await conn.execute(text(
+        "SELECT table_name, column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() "
+        "AND column_name IN ('created_at', 'updated_at') "
+        "AND column_default IS NULL"
+    ))
+    missing = set(result.all())
+
+    # ALTER TABLE takes an ACCESS EXCLUSIVE lock, so only run it when needed
+    for table in Base.metadata.sorted_tables:
+        for column in table.columns:
+            if (table.name, column.name) in missing:
+                await conn.execute(text(
+                    f"ALTER TABLE {table.name} ALTER COLUMN {column.name} SET DEFAULT now()"
+                ))
+
+
+async def ensure_vector_index():
+    """
+    Build the HNSW index on chunk embeddings without blocking writes.
+
+    Runs CREATE INDEX CONCURRENTLY on an autocommit connection, since it
+    cannot run inside a transaction. Meant to be started as a background
+    task after init_db; progress is reported through vector_index_status.
+
+    CONCURRENTLY is not supported on partitioned tables, so each partition
+    of document_chunks gets its own index; the planner uses them directly.
+    With binary_rerank enabled, a Hamming-distance index on the
+    binary-quantized embeddings is built the same way.
+    """
+    global vector_index_status
+    vector_index_status = "building"
+
+    try:
+        async with async_engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+            # HNSW index for inner product (<#>) search over unit-norm embeddings
+            indexes = [(VECTOR_INDEX_NAME, "embedding halfvec_ip_ops")]
+            if settings.binary_rerank:
+                # First-stage candidates by Hamming distance over sign bits
+                indexes.append((
+                    BINARY_VECTOR_INDEX_NAME,
+                    f"(binary_quantize(embedding)::bit({settings.vector_dimension})) bit_hamming_ops"
+                ))
+
+            partitions = await _chunk_partitions(conn)
+            targets = []
+            for base_name, index_spec in indexes:
+                if partitions:
+                    targets.extend(
+                        (partition, f"{base_name}_{partition}", index_spec)
+                        for partition in partitions
+                    )
+                else:
+                    targets.append(("document_chunks", base_name, index_spec))
+
+            for table_name, index_name, index_spec in targets:
+                # A previously interrupted concurrent build leaves an invalid index
+                # behind that IF NOT EXISTS would otherwise accept
+                result = await conn.execute(
+                    text(
+                        "SELECT i.indisvalid FROM pg_index i "
+                        "JOIN pg_class c ON c.oid = i.indexrelid "
+                        "WHERE c.relname = :name"
+                    ),
+                    {"name": index_name}
+                )
+                if result.scalar_one_or_none() is False:
+                    await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+
+                await conn.execute(text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                    f"ON {table_name} USING hnsw ({index_spec}) "
+                    f"WITH (m = {settings.hnsw_m}, ef_construction = {settings.hnsw_ef_construction})"
+                ))
+
+            # Drop the cosine index only once its replacement is usable
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {LEGACY_VECTOR_INDEX_NAME}"))
+
+        vector_index_status = "ready"
+        logger.info("Vector index ready")
+
+    except Exception as e:
+        vector_index_status = f"failed: {str(e)}"
+        logger.error(f"Failed to build vector index: {e}")
+
 
 async def close_db():
     """Close database connections."""
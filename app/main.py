@@ -1,14 +1,18 @@
 """Main FastAPI application for RAG-Anything API."""
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.config import settings
-from app.db import close_db, init_db
+from app.db import close_db, ensure_vector_index, init_db
 from app.routers import conversation, documents, health
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.llm_service import LLMService, create_openai_client
 
 # Configure logging
 logging.basicConfig(
@@ -30,11 +34,27 @@ async def lifespan(app: FastAPI):
         logger.error(f"Failed to initialize database: {e}")
         raise
 
+    # One OpenAI client per process so HTTP connections are reused across requests
+    app.state.openai = create_openai_client()
+
+    # One LLM service shared by all requests; concurrent query embeddings
+    # are coalesced into batched API requests
+    app.state.llm_service = LLMService(app.state.openai)
+    app.state.embedding_batcher = EmbeddingBatcher(app.state.llm_service)
+    app.state.llm_service.embedding_batcher = app.state.embedding_batcher
+    app.state.embedding_batcher.start()
+
+    # Build the vector index in the background so startup does not wait on it
+    app.state.vector_index_task = asyncio.create_task(ensure_vector_index())
+
     yield
 
     # Shutdown
     logger.info("Shutting down RAG-Anything API service...")
+    app.state.vector_index_task.cancel()
     try:
+        await app.state.embedding_batcher.stop()
+        await app.state.openai.close()
         await close_db()
         logger.info("Database connections closed")
     except Exception as e:
@@ -48,6 +68,7 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan,
     debug=settings.debug,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
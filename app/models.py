@@ -1,16 +1,30 @@
 """Database models for RAG-Anything API."""
 
-from datetime import datetime
 from typing import List, Optional
 
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import HALFVEC
 from sqlalchemy import JSON, Column, DateTime, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 
 from app.config import settings
 from app.db import Base
 
 
+class BinaryHalfVec(HALFVEC):
+    """
+    HALFVEC that hands values to asyncpg unconverted.
+
+    pgvector's asyncpg codec (registered in app.db) encodes numpy arrays in
+    the binary protocol; the base type would first render them as text.
+    """
+
+    cache_ok = True
+
+    def bind_processor(self, dialect):
+        return None
+
+
 class Document(Base):
     """Document model for storing RAG source documents."""
 
@@ -20,25 +34,43 @@ class Document(Base):
     title = Column(String(500), nullable=False)
     content = Column(Text, nullable=False)
     meta_data = Column(JSON, default={})
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    # Relationships
-    chunks = relationship("DocumentChunk", back_populates="document", cascade="all, delete-orphan")
+    # Relationships; chunks are removed by the ON DELETE CASCADE foreign key
+    # instead of being loaded and deleted one by one
+    chunks = relationship(
+        "DocumentChunk",
+        back_populates="document",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
 
 
 class DocumentChunk(Base):
-    """Document chunk model with vector embeddings."""
+    """
+    Document chunk model with vector embeddings.
 
-    __tablename__ = "document_chunks"
+    The table is hash partitioned by document_id (partitions are created in
+    init_db), so the primary key has to include document_id.
+    """
 
-    id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    __tablename__ = "document_chunks"
+    __table_args__ = {"postgresql_partition_by": "HASH (document_id)"}
+
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    document_id = Column(
+        Integer,
+        ForeignKey("documents.id", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+        index=True
+    )
     chunk_text = Column(Text, nullable=False)
     chunk_index = Column(Integer, nullable=False)  # Position in document
-    embedding = Column(Vector(settings.vector_dimension))  # Vector embedding
+    embedding = Column(BinaryHalfVec(settings.vector_dimension))  # FP16 vector embedding
     meta_data = Column(JSON, default={})
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     document = relationship("Document", back_populates="chunks")
@@ -52,8 +84,8 @@ class Conversation(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(500), nullable=True)
     user_id = Column(String(100), nullable=True)  # Optional user identifier
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
@@ -69,7 +101,7 @@ class Message(Base):
     role = Column(String(20), nullable=False)  # 'user', 'assistant', 'system'
     content = Column(Text, nullable=False)
     meta_data = Column(JSON, default={})  # Store sources, tokens, etc.
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
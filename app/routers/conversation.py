@@ -1,12 +1,16 @@
 """Conversation and RAG query endpoints."""
 
 import logging
+from contextlib import aclosing
 
+import orjson
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_async_db
+from app.db import AsyncSessionLocal, get_async_db
 from app.schemas import RAGQueryRequest, RAGQueryResponse
+from app.services.llm_service import LLMService, get_llm_service
 from app.services.rag_service import RAGService
 
 router = APIRouter()
@@ -16,7 +20,8 @@ logger = logging.getLogger(__name__)
 @router.post("/messages", response_model=RAGQueryResponse)
 async def create_message(
     request: RAGQueryRequest,
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_async_db),
+    llm_service: LLMService = Depends(get_llm_service)
 ):
     """
     Submit a query to the RAG system.
@@ -29,7 +34,7 @@ async def create_message(
     """
     try:
         # Initialize RAG service
-        rag_service = RAGService(db)
+        rag_service = RAGService(db, llm_service)
 
         # Process query
         response = await rag_service.process_query(
@@ -44,3 +49,47 @@ async def create_message(
     except Exception as e:
         logger.error(f"Error processing RAG query: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to process query: {str(e)}")
+
+
+def _format_sse(event: str, data: dict) -> str:
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {orjson.dumps(data, default=str).decode()}\n\n"
+
+
+@router.post("/messages/stream")
+async def create_message_stream(
+    request: RAGQueryRequest,
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """
+    Submit a query to the RAG system and stream the response.
+
+    Returns a text/event-stream of server-sent events:
+    1. `sources` with the conversation ID and retrieved source documents
+    2. `token` for each generated text delta
+    3. `done` with the stored message ID once the conversation is saved
+
+    On failure an `error` event is sent instead.
+    """
+    async def event_stream():
+        # The request-scoped session from get_async_db is closed before a
+        # streaming body runs, so the stream manages its own session
+        async with AsyncSessionLocal() as db:
+            rag_service = RAGService(db, llm_service)
+            try:
+                # Close the inner generator explicitly so its final message
+                # write runs before the session is closed, also on disconnect
+                async with aclosing(rag_service.process_query_stream(
+                    query=request.query,
+                    conversation_id=request.conversation_id,
+                    top_k=request.top_k or 5,
+                    include_sources=request.include_sources
+                )) as events:
+                    async for event, data in events:
+                        yield _format_sse(event, data)
+
+            except Exception as e:
+                logger.error(f"Error streaming RAG query: {e}", exc_info=True)
+                yield _format_sse("error", {"detail": f"Failed to process query: {str(e)}"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
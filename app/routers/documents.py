@@ -1,13 +1,15 @@
 """Document management endpoints."""
 
 import logging
+from typing import List, Union
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_async_db
-from app.schemas import DocumentCreate, DocumentResponse
+from app.schemas import DocumentCreate, DocumentResponse, DocumentSummary
 from app.services.document_service import DocumentService
+from app.services.llm_service import LLMService, get_llm_service
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -16,7 +18,8 @@ logger = logging.getLogger(__name__)
 @router.post("/", response_model=DocumentResponse)
 async def create_document(
     document: DocumentCreate,
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_async_db),
+    llm_service: LLMService = Depends(get_llm_service)
 ):
     """
     Upload a document to the RAG system.
@@ -28,7 +31,7 @@ async def create_document(
     4. Stores embeddings in the vector store
     """
     try:
-        doc_service = DocumentService(db)
+        doc_service = DocumentService(db, llm_service)
         result = await doc_service.create_document(
             title=document.title,
             content=document.content,
@@ -41,15 +44,42 @@ async def create_document(
         raise HTTPException(status_code=500, detail=f"Failed to create document: {str(e)}")
 
 
-@router.get("/{document_id}", response_model=DocumentResponse)
+@router.get("/", response_model=List[DocumentSummary])
+async def list_documents(
+    skip: int = Query(0, ge=0, description="Number of documents to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of documents to return"),
+    db: AsyncSession = Depends(get_async_db),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """List documents without their content, newest first."""
+    try:
+        doc_service = DocumentService(db, llm_service)
+        return await doc_service.list_documents(skip=skip, limit=limit)
+
+    except Exception as e:
+        logger.error(f"Error listing documents: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to list documents: {str(e)}")
+
+
+@router.get("/{document_id}", response_model=Union[DocumentResponse, DocumentSummary])
 async def get_document(
     document_id: int,
-    db: AsyncSession = Depends(get_async_db)
+    include_content: bool = Query(True, description="Include the full document content"),
+    db: AsyncSession = Depends(get_async_db),
+    llm_service: LLMService = Depends(get_llm_service)
 ):
-    """Get a document by ID."""
+    """
+    Get a document by ID.
+
+    With include_content=false, the document content is not read from the
+    database and is omitted from the response.
+    """
     try:
-        doc_service = DocumentService(db)
-        result = await doc_service.get_document(document_id)
+        doc_service = DocumentService(db, llm_service)
+        if include_content:
+            result = await doc_service.get_document_content(document_id)
+        else:
+            result = await doc_service.get_document(document_id)
 
         if not result:
             raise HTTPException(status_code=404, detail="Document not found")
@@ -1,47 +1,78 @@
 """Health check endpoints."""
 
+import asyncio
 import logging
+import time
 from datetime import datetime
 
 from fastapi import APIRouter, Depends
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import db as database
 from app.config import settings
 from app.db import get_async_db
 from app.schemas import HealthResponse
-from app.services.llm_service import LLMService
+from app.services.llm_service import LLMService, get_llm_service
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-@router.get("/health", response_model=HealthResponse)
-async def health_check(db: AsyncSession = Depends(get_async_db)):
-    """
-    Health check endpoint.
+# Last probe results: monotonic timestamp and status string
+_db_status_cache = {"ts": float("-inf"), "status": "unknown"}
+_openai_status_cache = {"ts": float("-inf"), "status": "unknown"}
 
-    Verifies:
-    - API service is running
-    - Database connection is active
-    - OpenAI API is accessible
-    """
-    # Check database connection
-    db_status = "healthy"
+
+async def _database_status(db: AsyncSession, use_cache: bool = True) -> str:
+    """Ping the database, reusing a result younger than health_db_cache_ttl."""
+    now = time.monotonic()
+    if use_cache and now - _db_status_cache["ts"] < settings.health_db_cache_ttl:
+        return _db_status_cache["status"]
+
+    status = "healthy"
     try:
         await db.execute(text("SELECT 1"))
     except Exception as e:
         logger.error(f"Database health check failed: {e}")
-        db_status = f"unhealthy: {str(e)}"
+        status = f"unhealthy: {str(e)}"
+
+    _db_status_cache.update(ts=now, status=status)
+    return status
+
 
-    # Check OpenAI API
-    openai_status = "healthy"
+async def _openai_status(llm_service: LLMService, use_cache: bool = True) -> str:
+    """Ping the OpenAI API, reusing a result younger than health_openai_cache_ttl."""
+    now = time.monotonic()
+    if use_cache and now - _openai_status_cache["ts"] < settings.health_openai_cache_ttl:
+        return _openai_status_cache["status"]
+
+    status = "healthy"
     try:
-        llm_service = LLMService()
         await llm_service.test_connection()
     except Exception as e:
         logger.error(f"OpenAI health check failed: {e}")
-        openai_status = f"unhealthy: {str(e)}"
+        status = f"unhealthy: {str(e)}"
+
+    _openai_status_cache.update(ts=now, status=status)
+    return status
+
+
+async def _health_response(
+    db: AsyncSession,
+    llm_service: LLMService,
+    use_cache: bool = True
+) -> HealthResponse:
+    """Probe the database and OpenAI API concurrently and build the response."""
+    db_status, openai_status = await asyncio.gather(
+        _database_status(db, use_cache),
+        _openai_status(llm_service, use_cache),
+        return_exceptions=True
+    )
+    if isinstance(db_status, Exception):
+        db_status = f"unhealthy: {str(db_status)}"
+    if isinstance(openai_status, Exception):
+        openai_status = f"unhealthy: {str(openai_status)}"
 
     # Overall status
     overall_status = "healthy" if db_status == "healthy" and openai_status == "healthy" else "degraded"
@@ -50,5 +81,35 @@ async def health_check(db: AsyncSession = Depends(get_async_db)):
         status=overall_status,
         database=db_status,
         openai=openai_status,
+        vector_index=database.vector_index_status,
         timestamp=datetime.utcnow()
     )
+
+
+@router.get("/health", response_model=HealthResponse)
+async def health_check(
+    db: AsyncSession = Depends(get_async_db),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """
+    Health check endpoint.
+
+    Verifies:
+    - API service is running
+    - Database connection is active
+    - OpenAI API is accessible
+    - Vector index build status (does not affect overall status)
+
+    Probe results are cached briefly so frequent load balancer checks
+    do not hit the database or spend OpenAI tokens on every call.
+    """
+    return await _health_response(db, llm_service)
+
+
+@router.get("/health/deep", response_model=HealthResponse)
+async def deep_health_check(
+    db: AsyncSession = Depends(get_async_db),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """Health check that always probes the database and OpenAI API."""
+    return await _health_response(db, llm_service, use_cache=False)
@@ -3,7 +3,7 @@
 from datetime import datetime
 from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 
 
 # Document schemas
@@ -19,9 +19,15 @@ class DocumentCreate(DocumentBase):
     pass
 
 
-class DocumentResponse(DocumentBase):
-    """Schema for document response."""
+class DocumentSummary(BaseModel):
+    """Schema for document response without content."""
     id: int
+    title: str
+    metadata: Dict = Field(
+        default_factory=dict,
+        validation_alias=AliasChoices("meta_data", "metadata"),
+        description="Additional metadata"
+    )
     created_at: datetime
     updated_at: datetime
 
@@ -29,6 +35,11 @@ class DocumentResponse(DocumentBase):
         from_attributes = True
 
 
+class DocumentResponse(DocumentSummary):
+    """Schema for document response."""
+    content: str = Field(..., description="Document content")
+
+
 # Conversation schemas
 class MessageBase(BaseModel):
     """Base message schema."""
@@ -70,7 +81,10 @@ class RAGQueryRequest(BaseModel):
     """Schema for RAG query request."""
     query: str = Field(..., description="User query")
     conversation_id: Optional[int] = Field(None, description="Conversation ID for context")
-    top_k: Optional[int] = Field(5, description="Number of documents to retrieve")
+    top_k: Optional[int] = Field(
+        5,
+        description="Number of documents to retrieve; index searches return at most 1000"
+    )
     include_sources: bool = Field(True, description="Include source documents in response")
 
 
@@ -99,4 +113,5 @@ class HealthResponse(BaseModel):
     status: str = Field(..., description="Service status")
     database: str = Field(..., description="Database connection status")
     openai: str = Field(..., description="OpenAI API status")
+    vector_index: str = Field(..., description="HNSW vector index build status")
     timestamp: datetime = Field(default_factory=datetime.utcnow)
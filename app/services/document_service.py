@@ -1,32 +1,53 @@
 """Document management service."""
 
+import asyncio
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+from pydantic import TypeAdapter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
 from app.config import settings
 from app.models import Document
-from app.schemas import DocumentResponse
+from app.schemas import DocumentResponse, DocumentSummary
+from app.services.llm_service import LLMService
 from app.services.vector_service import VectorService
 
 logger = logging.getLogger(__name__)
 
+# Validators built once and reused for every ORM row conversion
+_document_adapter = TypeAdapter(DocumentResponse)
+_summary_adapter = TypeAdapter(DocumentSummary)
+_summary_list_adapter = TypeAdapter(List[DocumentSummary])
+
+# Columns needed for DocumentSummary; skips the (possibly large) content
+_SUMMARY_COLUMNS = load_only(
+    Document.id,
+    Document.title,
+    Document.meta_data,
+    Document.created_at,
+    Document.updated_at
+)
+
 
 class DocumentService:
     """Service for managing documents and their embeddings."""
 
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, llm_service: Optional[LLMService] = None):
         """Initialize document service."""
         self.db = db
-        self.vector_service = VectorService(db)
+        self.llm_service = llm_service or LLMService()
+        self.vector_service = VectorService(db, self.llm_service)
 
     def _chunk_text(self, text: str) -> list[str]:
         """
         Split text into chunks for embedding.
 
-        Simple chunking strategy: split by size with overlap.
+        Simple chunking strategy: split by size with overlap. Chunk start
+        offsets are a fixed stride of ``chunk_size - chunk_overlap``.
 
         Args:
             text: Text to chunk
@@ -36,23 +57,51 @@ class DocumentService:
         """
         chunk_size = settings.chunk_size
         overlap = settings.chunk_overlap
+        stride = chunk_size - overlap
 
-        chunks = []
-        start = 0
-
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-
-            # Avoid very small final chunks
-            if len(chunk) > overlap or start == 0:
-                chunks.append(chunk)
+        if stride <= 0:
+            raise ValueError("chunk_size must be greater than chunk_overlap")
 
-            start = end - overlap
+        # Avoid very small final chunks
+        text_length = len(text)
+        chunks = [
+            text[start:start + chunk_size]
+            for start in range(0, text_length, stride)
+            if start == 0 or text_length - start > overlap
+        ]
 
         logger.info(f"Split text into {len(chunks)} chunks")
         return chunks
 
+    async def _embed_chunks(self, chunks: List[str]) -> List[Tuple[str, np.ndarray]]:
+        """
+        Generate embeddings for chunks in batched API requests.
+
+        Chunks are sent in sublists of ``embedding_batch_size`` and the
+        batches are requested concurrently.
+
+        Args:
+            chunks: List of text chunks
+
+        Returns:
+            List of (chunk_text, embedding) pairs in chunk order
+        """
+        batch_size = settings.embedding_batch_size
+        batches = [
+            chunks[start:start + batch_size]
+            for start in range(0, len(chunks), batch_size)
+        ]
+
+        results = await asyncio.gather(
+            *(self.llm_service.generate_embeddings(batch) for batch in batches)
+        )
+
+        if not results:
+            return []
+
+        embeddings = np.concatenate(results)
+        return list(zip(chunks, embeddings))
+
     async def create_document(
         self,
         title: str,
@@ -75,7 +124,7 @@ class DocumentService:
             document = Document(
                 title=title,
                 content=content,
-                metadata=metadata or {}
+                meta_data=metadata or {}
             )
             self.db.add(document)
             await self.db.flush()  # Get ID without committing
@@ -83,10 +132,11 @@ class DocumentService:
             # Chunk the content
             chunks = self._chunk_text(content)
 
-            # Add chunks with embeddings
-            await self.vector_service.add_document_chunks(
+            # Generate embeddings in batches and store chunks
+            pairs = await self._embed_chunks(chunks)
+            await self.vector_service.add_document_chunks_with_embeddings(
                 document_id=document.id,
-                chunks=chunks
+                pairs=pairs
             )
 
             await self.db.commit()
@@ -94,16 +144,45 @@ class DocumentService:
 
             logger.info(f"Created document {document.id} with {len(chunks)} chunks")
 
-            return DocumentResponse.model_validate(document)
+            return _document_adapter.validate_python(document, from_attributes=True)
 
         except Exception as e:
             await self.db.rollback()
             logger.error(f"Error creating document: {e}")
             raise
 
-    async def get_document(self, document_id: int) -> Optional[DocumentResponse]:
+    async def get_document(self, document_id: int) -> Optional[DocumentSummary]:
+        """
+        Get document by ID without its content.
+
+        Only the small columns are loaded, so the lookup cost does not
+        depend on document size.
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            Document summary if found, None otherwise
+        """
+        try:
+            result = await self.db.execute(
+                select(Document)
+                .options(_SUMMARY_COLUMNS)
+                .where(Document.id == document_id)
+            )
+            document = result.scalar_one_or_none()
+
+            if document:
+                return _summary_adapter.validate_python(document, from_attributes=True)
+            return None
+
+        except Exception as e:
+            logger.error(f"Error getting document: {e}")
+            raise
+
+    async def get_document_content(self, document_id: int) -> Optional[DocumentResponse]:
         """
-        Get document by ID.
+        Get document by ID including its full content.
 
         Args:
             document_id: Document ID
@@ -118,11 +197,38 @@ class DocumentService:
             document = result.scalar_one_or_none()
 
             if document:
-                return DocumentResponse.model_validate(document)
+                return _document_adapter.validate_python(document, from_attributes=True)
             return None
 
         except Exception as e:
-            logger.error(f"Error getting document: {e}")
+            logger.error(f"Error getting document content: {e}")
+            raise
+
+    async def list_documents(self, skip: int = 0, limit: int = 100) -> List[DocumentSummary]:
+        """
+        List documents without their content, newest first.
+
+        Args:
+            skip: Number of documents to skip
+            limit: Maximum number of documents to return
+
+        Returns:
+            List of document summaries
+        """
+        try:
+            result = await self.db.execute(
+                select(Document)
+                .options(_SUMMARY_COLUMNS)
+                .order_by(Document.id.desc())
+                .offset(skip)
+                .limit(limit)
+            )
+            documents = result.scalars().all()
+
+            return _summary_list_adapter.validate_python(documents, from_attributes=True)
+
+        except Exception as e:
+            logger.error(f"Error listing documents: {e}")
             raise
 
     async def delete_document(self, document_id: int) -> bool:
@@ -144,7 +250,7 @@ class DocumentService:
             if not document:
                 return False
 
-            # Delete chunks (via cascade)
+            # Chunks are deleted by the database (ON DELETE CASCADE)
             await self.db.delete(document)
             await self.db.commit()
 
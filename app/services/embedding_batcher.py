@@ -0,0 +1,120 @@
+"""Micro-batching of concurrent query embedding requests."""
+
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Coalesce concurrent single-text embedding requests into batched API calls.
+
+    Requests are queued; a background task collects up to ``max_batch`` of
+    them, waiting at most ``max_wait_ms`` after the first one arrives, and
+    embeds them with one OpenAI request. Requests that do not overlap in time
+    are sent on their own after the short wait.
+    """
+
+    def __init__(
+        self,
+        llm_service,
+        max_batch: Optional[int] = None,
+        max_wait_ms: Optional[float] = None
+    ):
+        """
+        Initialize embedding batcher.
+
+        Args:
+            llm_service: LLMService used to generate embeddings
+            max_batch: Maximum texts per API request
+            max_wait_ms: Maximum time to wait for more requests to join a batch
+        """
+        self.llm_service = llm_service
+        self.max_batch = max_batch or settings.embedding_batch_max_size
+        self.max_wait = (max_wait_ms or settings.embedding_batch_max_wait_ms) / 1000
+        self._queue: "asyncio.Queue[Tuple[str, asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    def start(self):
+        """Start the background batching task if it is not running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop batching and fail requests that are still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding batcher stopped"))
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a single text as part of the next batch.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            float32 embedding vector
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        """Collect queued requests into batches and dispatch them."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch without waiting so the next batch can fill meanwhile
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Embed one batch and resolve the waiting futures."""
+        texts = [text for text, _ in batch]
+
+        try:
+            embeddings = await self.llm_service.generate_embeddings(texts)
+        except Exception as e:
+            logger.error(f"Error generating batched embeddings: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), embedding in zip(batch, embeddings):
+            # Callers may have been cancelled while the request was in flight
+            if not future.done():
+                future.set_result(embedding)
+
+        logger.debug(f"Embedded batch of {len(batch)} queries")
@@ -1,8 +1,13 @@
 """LLM service for OpenAI integration."""
 
+import hashlib
 import logging
-from typing import List, Optional
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional, Tuple
 
+import httpx
+import numpy as np
+from fastapi import Request
 from openai import AsyncOpenAI
 from tenacity import retry, stop_after_attempt, wait_exponential
 
@@ -10,17 +15,91 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Query embeddings keyed by (embedding model, query digest), shared across
+# LLMService instances; most recently used entries last
+_query_embedding_cache: "OrderedDict[Tuple[str, bytes], np.ndarray]" = OrderedDict()
+
+
+def _normalize_query(text: str) -> str:
+    """Collapse whitespace so trivially different queries share an embedding."""
+    return " ".join(text.split())
+
+
+def _query_digest(normalized: str) -> bytes:
+    """Fixed-size cache key for a normalized query, so long queries are not kept in memory."""
+    return hashlib.blake2b(normalized.lower().encode(), digest_size=16).digest()
+
+
+def create_openai_client() -> AsyncOpenAI:
+    """Create an OpenAI client with a pooled, keep-alive HTTP client."""
+    return AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_keepalive_connections,
+            )
+        ),
+    )
+
+
+def _usage_dict(usage) -> dict:
+    """Token usage of a completion, including prompt tokens served from the prompt cache."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "cached_tokens": getattr(details, "cached_tokens", None) or 0
+    }
+
+
+def get_llm_service(request: Request) -> "LLMService":
+    """Dependency for getting the application-wide LLM service."""
+    return request.app.state.llm_service
+
 
 class LLMService:
     """Service for interacting with OpenAI API."""
 
-    def __init__(self):
-        """Initialize OpenAI client."""
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+    def __init__(self, client: Optional[AsyncOpenAI] = None, embedding_batcher=None):
+        """
+        Initialize LLM service.
+
+        Args:
+            client: Shared OpenAI client; a dedicated one is created if omitted
+            embedding_batcher: Optional EmbeddingBatcher that coalesces
+                concurrent query embeddings into one API request
+        """
+        self.client = client or AsyncOpenAI(api_key=settings.openai_api_key)
+        self.embedding_batcher = embedding_batcher
         self.model = settings.openai_model
         self.temperature = settings.llm_temperature
         self.max_tokens = settings.llm_max_tokens
 
+    def _completion_params(
+        self,
+        messages: List[dict],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> dict:
+        """Build chat completion request parameters for the configured model."""
+        # gpt-5 models have different parameter requirements
+        completion_params = {
+            "model": self.model,
+            "messages": messages,
+        }
+
+        # gpt-5 models: use max_completion_tokens, don't set temperature (only default 1.0 supported)
+        if self.model.startswith("gpt-5"):
+            completion_params["max_completion_tokens"] = max_tokens or self.max_tokens
+            # gpt-5 models don't support custom temperature, skip it
+        else:
+            completion_params["max_tokens"] = max_tokens or self.max_tokens
+            completion_params["temperature"] = temperature or self.temperature
+
+        return completion_params
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
@@ -45,30 +124,14 @@ class LLMService:
         """
         try:
             logger.info(f"Using OpenAI model: {self.model}")
-            # gpt-5 models have different parameter requirements
-            completion_params = {
-                "model": self.model,
-                "messages": messages,
-            }
-
-            # gpt-5 models: use max_completion_tokens, don't set temperature (only default 1.0 supported)
-            if self.model.startswith("gpt-5"):
-                completion_params["max_completion_tokens"] = max_tokens or self.max_tokens
-                # gpt-5 models don't support custom temperature, skip it
-            else:
-                completion_params["max_tokens"] = max_tokens or self.max_tokens
-                completion_params["temperature"] = temperature or self.temperature
+            completion_params = self._completion_params(messages, temperature, max_tokens)
 
             response = await self.client.chat.completions.create(**completion_params)
 
             return {
                 "content": response.choices[0].message.content,
                 "model": response.model,
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                },
+                "usage": _usage_dict(response.usage),
                 "finish_reason": response.choices[0].finish_reason
             }
 
@@ -76,12 +139,66 @@ class LLMService:
             logger.error(f"Error generating chat completion: {e}")
             raise
 
+    async def stream_chat_completion(
+        self,
+        messages: List[dict],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Stream a chat completion from OpenAI API.
+
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            temperature: Override default temperature
+            max_tokens: Override default max tokens
+
+        Yields:
+            Dicts with a 'content' text delta; the final dict also carries
+            'model', 'usage' and 'finish_reason'
+        """
+        try:
+            logger.info(f"Streaming from OpenAI model: {self.model}")
+            completion_params = self._completion_params(messages, temperature, max_tokens)
+
+            stream = await self.client.chat.completions.create(
+                **completion_params,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+
+            model = self.model
+            finish_reason = None
+            # Closing the stream releases the HTTP connection and stops
+            # generation when the consumer stops early
+            async with stream:
+                async for chunk in stream:
+                    model = chunk.model or model
+                    if chunk.choices:
+                        choice = chunk.choices[0]
+                        finish_reason = choice.finish_reason or finish_reason
+                        if choice.delta.content:
+                            yield {"content": choice.delta.content}
+
+                    # The usage chunk is sent last, with no choices
+                    if chunk.usage:
+                        yield {
+                            "content": "",
+                            "model": model,
+                            "usage": _usage_dict(chunk.usage),
+                            "finish_reason": finish_reason
+                        }
+
+        except Exception as e:
+            logger.error(f"Error streaming chat completion: {e}")
+            raise
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
         reraise=True
     )
-    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    async def generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for texts using OpenAI API.
 
@@ -89,7 +206,7 @@ class LLMService:
             texts: List of texts to embed
 
         Returns:
-            List of embedding vectors
+            float32 array of shape (len(texts), embedding dimension)
         """
         try:
             response = await self.client.embeddings.create(
@@ -97,13 +214,53 @@ class LLMService:
                 input=texts
             )
 
-            embeddings = [item.embedding for item in response.data]
+            embeddings = np.stack([
+                np.asarray(item.embedding, dtype=np.float32)
+                for item in response.data
+            ])
             return embeddings
 
         except Exception as e:
             logger.error(f"Error generating embeddings: {e}")
             raise
 
+    async def embed_query(self, query: str) -> np.ndarray:
+        """
+        Generate an embedding for a search query, cached in-process.
+
+        Cache keys are case-insensitive and ignore whitespace differences.
+        The returned array is shared with the cache and read-only.
+
+        Args:
+            query: Query text to embed
+
+        Returns:
+            float32 embedding vector
+        """
+        normalized = _normalize_query(query)
+        key = (settings.openai_embedding_model, _query_digest(normalized))
+
+        cached = _query_embedding_cache.get(key)
+        if cached is not None:
+            _query_embedding_cache.move_to_end(key)
+            return cached
+
+        if self.embedding_batcher is not None:
+            embedding = await self.embedding_batcher.embed(normalized)
+        else:
+            embedding = (await self.generate_embeddings([normalized]))[0]
+
+        # The result is a row view of the batch matrix; copy it so the cache
+        # entry does not keep the whole batch alive
+        embedding = embedding.copy()
+        embedding.flags.writeable = False
+
+        _query_embedding_cache[key] = embedding
+        if len(_query_embedding_cache) > settings.embedding_cache_size:
+            _query_embedding_cache.popitem(last=False)
+
+        return embedding
+
     async def test_connection(self) -> bool:
         """
         Test OpenAI API connection.
@@ -1,11 +1,15 @@
 """RAG (Retrieval-Augmented Generation) service."""
 
+import asyncio
 import logging
-from typing import Optional
+from contextlib import aclosing
+from itertools import islice
+from typing import AsyncIterator, List, Optional, Tuple
 
-from sqlalchemy import select
+import anyio
+import numpy as np
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.models import Conversation, Message
 from app.schemas import RAGQueryResponse, SourceDocument
@@ -14,15 +18,31 @@ from app.services.vector_service import VectorService
 
 logger = logging.getLogger(__name__)
 
+# Static instructions, kept byte-identical and first in every request so the
+# provider can serve the prompt prefix from its prompt cache. Everything that
+# varies per query goes in the final user message.
+SYSTEM_PROMPT = """You are a helpful AI assistant with access to a knowledge base.
+Use the provided context to answer questions accurately and concisely.
+If the context doesn't contain relevant information, say so clearly.
+Always cite which parts of the context you used in your answer.
+
+Context from the knowledge base is given in the latest user message as
+numbered blocks headed [Source 1], [Source 2], and so on, separated by ---.
+Cite sources by their number, for example [Source 2].
+Base your answer on the context provided with the question."""
+
+# Context block headers for the usual top_k range, built once
+_SOURCE_HEADERS = tuple(f"[Source {idx + 1}]\n" for idx in range(20))
+
 
 class RAGService:
     """Service for RAG query processing."""
 
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, llm_service: Optional[LLMService] = None):
         """Initialize RAG service."""
         self.db = db
-        self.llm_service = LLMService()
-        self.vector_service = VectorService(db)
+        self.llm_service = llm_service or LLMService()
+        self.vector_service = VectorService(db, self.llm_service)
 
     async def _get_or_create_conversation(
         self,
@@ -38,10 +58,9 @@ class RAGService:
             Conversation object
         """
         if conversation_id:
+            # Messages are not loaded; prompts do not include history yet
             result = await self.db.execute(
-                select(Conversation)
-                .where(Conversation.id == conversation_id)
-                .options(selectinload(Conversation.messages))
+                select(Conversation).where(Conversation.id == conversation_id)
             )
             conversation = result.scalar_one_or_none()
 
@@ -55,11 +74,42 @@ class RAGService:
         self.db.add(conversation)
         await self.db.flush()
 
-        # Initialize messages list to prevent lazy loading issues
-        await self.db.refresh(conversation, ["messages"])
-
         return conversation
 
+    async def _get_conversation_and_embedding(
+        self,
+        conversation_id: Optional[int],
+        query: str
+    ) -> Tuple[Conversation, np.ndarray]:
+        """
+        Get or create the conversation while the query is embedded.
+
+        The embedding runs as a separate task since it does not use the
+        database session; the session work is awaited directly. If either
+        side fails, the embedding task is cancelled and awaited so no
+        operation is left running when the caller rolls back.
+
+        Args:
+            conversation_id: Optional conversation ID
+            query: User query
+
+        Returns:
+            (conversation, query_embedding) tuple
+        """
+        embed_task = asyncio.create_task(self.llm_service.embed_query(query))
+        try:
+            conversation = await self._get_or_create_conversation(conversation_id)
+            query_embedding = await embed_task
+        except BaseException:
+            embed_task.cancel()
+            try:
+                await embed_task
+            except BaseException:
+                pass
+            raise
+
+        return conversation, query_embedding
+
     def _build_prompt(
         self,
         query: str,
@@ -69,6 +119,10 @@ class RAGService:
         """
         Build prompt messages for LLM.
 
+        Messages are ordered from most to least stable (static system
+        prompt, conversation history, then retrieved context and the query)
+        to maximize prompt cache hits.
+
         Args:
             query: User query
             context_chunks: Retrieved context chunks
@@ -77,17 +131,13 @@ class RAGService:
         Returns:
             List of message dicts for LLM
         """
-        # System prompt
-        system_prompt = """You are a helpful AI assistant with access to a knowledge base.
-Use the provided context to answer questions accurately and concisely.
-If the context doesn't contain relevant information, say so clearly.
-Always cite which parts of the context you used in your answer."""
-
-        messages = [{"role": "system", "content": system_prompt}]
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
 
         # Add conversation history if available
         if conversation_history:
-            for msg in conversation_history[-5:]:  # Last 5 messages for context
+            # Last 5 messages for context, without copying the list tail
+            start = max(0, len(conversation_history) - 5)
+            for msg in islice(conversation_history, start, None):
                 messages.append({
                     "role": msg.role,
                     "content": msg.content
@@ -95,10 +145,11 @@ Always cite which parts of the context you used in your answer."""
 
         # Build context from retrieved chunks
         if context_chunks:
-            context_text = "\n\n---\n\n".join([
-                f"[Source {idx + 1}]\n{chunk[0].chunk_text}"
-                for idx, chunk in enumerate(context_chunks)
-            ])
+            context_text = "\n\n---\n\n".join(
+                (_SOURCE_HEADERS[idx] if idx < len(_SOURCE_HEADERS) else f"[Source {idx + 1}]\n")
+                + chunk.chunk_text
+                for idx, (chunk, _) in enumerate(context_chunks)
+            )
 
             user_message = f"""Context from knowledge base:
 
@@ -106,9 +157,7 @@ Always cite which parts of the context you used in your answer."""
 
 ---
 
-Question: {query}
-
-Please answer based on the context provided above."""
+Question: {query}"""
         else:
             user_message = f"""Question: {query}
 
@@ -118,6 +167,105 @@ Note: No relevant context was found in the knowledge base. Please answer based o
 
         return messages
 
+    async def _store_exchange(
+        self,
+        conversation_id: int,
+        query: str,
+        response: str,
+        meta_data: dict
+    ) -> int:
+        """
+        Store a user query and the assistant response, then commit.
+
+        Both rows are written by one multi-row INSERT ... RETURNING, so the
+        message IDs come back without a separate refresh.
+
+        Args:
+            conversation_id: Conversation ID
+            query: User query
+            response: Assistant response text
+            meta_data: Assistant message metadata
+
+        Returns:
+            ID of the stored assistant message
+        """
+        result = await self.db.execute(
+            insert(Message)
+            .values([
+                {
+                    "conversation_id": conversation_id,
+                    "role": "user",
+                    "content": query,
+                    "meta_data": {}
+                },
+                {
+                    "conversation_id": conversation_id,
+                    "role": "assistant",
+                    "content": response,
+                    "meta_data": meta_data
+                }
+            ])
+            .returning(Message.id, Message.role)
+        )
+        message_ids = {role: message_id for message_id, role in result.all()}
+
+        await self.db.commit()
+
+        return message_ids["assistant"]
+
+    async def _store_message(
+        self,
+        conversation_id: int,
+        role: str,
+        content: str,
+        meta_data: dict
+    ) -> Message:
+        """
+        Store a single conversation message and commit.
+
+        Args:
+            conversation_id: Conversation ID
+            role: Message role
+            content: Message text
+            meta_data: Message metadata
+
+        Returns:
+            Stored message
+        """
+        message = Message(
+            conversation_id=conversation_id,
+            role=role,
+            content=content,
+            meta_data=meta_data
+        )
+        self.db.add(message)
+
+        # The ID is assigned by the flush inside commit
+        await self.db.commit()
+
+        return message
+
+    def _build_sources(self, similar_chunks: list) -> List[SourceDocument]:
+        """
+        Convert retrieved chunks to source documents.
+
+        Args:
+            similar_chunks: List of (chunk, similarity_score) tuples
+
+        Returns:
+            List of source documents
+        """
+        return [
+            SourceDocument(
+                document_id=chunk.document_id,
+                chunk_id=chunk.id,
+                content=chunk.chunk_text,
+                similarity_score=score,
+                metadata=chunk.meta_data
+            )
+            for chunk, score in similar_chunks
+        ]
+
     async def process_query(
         self,
         query: str,
@@ -145,14 +293,18 @@ Note: No relevant context was found in the knowledge base. Please answer based o
             RAG query response
         """
         try:
-            # Get or create conversation
-            conversation = await self._get_or_create_conversation(conversation_id)
+            # Get or create conversation while the query is embedded
+            conversation, query_embedding = await self._get_conversation_and_embedding(
+                conversation_id,
+                query
+            )
 
             # Step 1: Retrieve relevant documents
             logger.info(f"Retrieving top {top_k} documents for query")
-            similar_chunks = await self.vector_service.similarity_search(
-                query=query,
-                top_k=top_k
+            similar_chunks = await self.vector_service.similarity_search_by_vector(
+                query_embedding,
+                top_k=top_k,
+                include_metadata=include_sources
             )
 
             # Step 2: Build prompt
@@ -168,48 +320,23 @@ Note: No relevant context was found in the knowledge base. Please answer based o
             llm_response = await self.llm_service.generate_chat_completion(messages)
 
             # Step 4: Store conversation
-            # Add user message
-            user_message = Message(
-                conversation_id=conversation.id,
-                role="user",
-                content=query,
-                meta_data={}
-            )
-            self.db.add(user_message)
-
-            # Add assistant message
-            assistant_message = Message(
+            assistant_message_id = await self._store_exchange(
                 conversation_id=conversation.id,
-                role="assistant",
-                content=llm_response["content"],
+                query=query,
+                response=llm_response["content"],
                 meta_data={
                     "model": llm_response["model"],
                     "usage": llm_response["usage"],
                     "sources_count": len(similar_chunks)
                 }
             )
-            self.db.add(assistant_message)
-
-            await self.db.commit()
-            await self.db.refresh(assistant_message)
 
             # Step 5: Build response
-            sources = []
-            if include_sources:
-                sources = [
-                    SourceDocument(
-                        document_id=chunk.document_id,
-                        chunk_id=chunk.id,
-                        content=chunk.chunk_text,
-                        similarity_score=score,
-                        metadata=chunk.meta_data
-                    )
-                    for chunk, score in similar_chunks
-                ]
+            sources = self._build_sources(similar_chunks) if include_sources else []
 
             response = RAGQueryResponse(
                 conversation_id=conversation.id,
-                message_id=assistant_message.id,
+                message_id=assistant_message_id,
                 query=query,
                 response=llm_response["content"],
                 sources=sources,
@@ -227,3 +354,122 @@ Note: No relevant context was found in the knowledge base. Please answer based o
             await self.db.rollback()
             logger.error(f"Error processing RAG query: {e}", exc_info=True)
             raise
+
+    async def process_query_stream(
+        self,
+        query: str,
+        conversation_id: Optional[int] = None,
+        top_k: int = 5,
+        include_sources: bool = True
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Process RAG query, streaming the response as it is generated.
+
+        Follows the same steps as process_query, but yields events as
+        (event_name, data) tuples:
+        - "sources": conversation ID and retrieved sources, before generation
+        - "token": a response text delta
+        - "done": stored message ID and metadata, after the response is saved
+
+        The user message is committed before generation starts. The
+        assistant message is stored once the stream ends, including when
+        the client disconnects or generation fails part way; a partial
+        response is marked with "interrupted" in its metadata.
+
+        Args:
+            query: User query
+            conversation_id: Optional conversation ID for context
+            top_k: Number of documents to retrieve
+            include_sources: Include source documents in the sources event
+
+        Yields:
+            (event_name, data) tuples
+        """
+        try:
+            # Get or create conversation while the query is embedded
+            conversation, query_embedding = await self._get_conversation_and_embedding(
+                conversation_id,
+                query
+            )
+
+            # Step 1: Retrieve relevant documents
+            logger.info(f"Retrieving top {top_k} documents for query")
+            similar_chunks = await self.vector_service.similarity_search_by_vector(
+                query_embedding,
+                top_k=top_k,
+                include_metadata=include_sources
+            )
+
+            # Store the user message first so it is durable even if the
+            # client disconnects during generation
+            await self._store_message(conversation.id, "user", query, {})
+
+            sources = self._build_sources(similar_chunks) if include_sources else []
+            yield "sources", {
+                "conversation_id": conversation.id,
+                "sources": [source.model_dump() for source in sources]
+            }
+
+            # Step 2: Build prompt
+            messages = self._build_prompt(
+                query=query,
+                context_chunks=similar_chunks,
+                conversation_history=None
+            )
+
+            # Step 3: Stream response
+            logger.info("Streaming response from OpenAI")
+            content_parts = []
+            stats = {"model": self.llm_service.model, "usage": {}}
+            completed = False
+            try:
+                # Close the completion stream explicitly so an early exit
+                # (client disconnect) also closes the OpenAI response
+                async with aclosing(self.llm_service.stream_chat_completion(messages)) as deltas:
+                    async for delta in deltas:
+                        if delta["content"]:
+                            content_parts.append(delta["content"])
+                            yield "token", {"content": delta["content"]}
+                        if "usage" in delta:
+                            stats = delta
+                completed = True
+
+            finally:
+                # Step 4: Store the assistant message once the stream ends,
+                # shielded so a client disconnect does not cancel the write
+                assistant_message = None
+                if completed or content_parts:
+                    meta_data = {
+                        "model": stats["model"],
+                        "usage": stats["usage"],
+                        "sources_count": len(similar_chunks)
+                    }
+                    if not completed:
+                        meta_data["interrupted"] = True
+
+                    with anyio.CancelScope(shield=True):
+                        assistant_message = await self._store_message(
+                            conversation.id,
+                            "assistant",
+                            "".join(content_parts),
+                            meta_data
+                        )
+
+            metadata = {
+                "model": stats["model"],
+                "usage": stats["usage"],
+                "retrieved_chunks": len(similar_chunks)
+            }
+
+            yield "done", {
+                "conversation_id": conversation.id,
+                "message_id": assistant_message.id,
+                "metadata": metadata
+            }
+
+            logger.info(f"Successfully streamed query in conversation {conversation.id}")
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error streaming RAG query: {e}", exc_info=True)
+            raise
@@ -1,33 +1,185 @@
-"""Vector store service for similarity search."""
+"""
+Vector store service for similarity search.
 
+Embeddings are L2-normalized before they are stored or searched, so cosine
+similarity equals the inner product and searches rank by pgvector's
+negative inner product operator (<#>), which skips per-row normalization.
+"""
+
+import asyncio
 import logging
-from typing import List, Tuple
+from collections import namedtuple
+from typing import List, Optional, Tuple
 
 import numpy as np
-from sqlalchemy import select, text
+from pgvector import HalfVector
+from sqlalchemy import Float, Integer, String, bindparam, delete, insert, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.models import DocumentChunk
+from app.models import BinaryHalfVec, DocumentChunk
 from app.services.llm_service import LLMService
 
 logger = logging.getLogger(__name__)
 
+# Chunk columns returned by searches; the prompt only needs the text, so
+# callers that do not return sources skip the rest
+CHUNK_COLUMNS = ("id", "document_id", "chunk_text", "chunk_index", "meta_data", "created_at")
+PROMPT_COLUMNS = ("id", "document_id", "chunk_text")
+
+
+def _search_stmt(columns: Tuple[str, ...], binary_rerank: bool = False):
+    """
+    Build a top-k similarity search statement.
+
+    <#> is the negative inner product, which equals -cosine similarity for
+    unit-norm vectors. The inner query only orders by distance and takes the
+    top k, which the HNSW index serves directly; the threshold is applied to
+    those k rows afterwards so the predicate cannot push the planner off the
+    index.
+
+    With binary_rerank, candidates come from the HNSW index on
+    binary-quantized embeddings (Hamming distance over sign bits) and are
+    reranked by the halfvec inner product.
+
+    Args:
+        columns: Chunk columns to return alongside similarity
+        binary_rerank: Build the two-stage binary quantized variant
+
+    Returns:
+        Text statement with typed bind parameters
+    """
+    column_list = ", ".join(columns)
+    source = "document_chunks"
+    params = [
+        bindparam("query_embedding", type_=BinaryHalfVec(settings.vector_dimension)),
+        bindparam("threshold", type_=Float),
+        bindparam("top_k", type_=Integer),
+    ]
+
+    if binary_rerank:
+        source = f"""(
+            SELECT {column_list}, embedding
+            FROM document_chunks
+            ORDER BY binary_quantize(embedding)::bit({settings.vector_dimension})
+                <~> binary_quantize(CAST(:query_embedding AS halfvec))
+            LIMIT :candidates
+        ) candidates"""
+        params.append(bindparam("candidates", type_=Integer))
+
+    return text(f"""
+        SELECT {column_list}, -distance AS similarity
+        FROM (
+            SELECT {column_list}, embedding <#> CAST(:query_embedding AS halfvec) AS distance
+            FROM {source}
+            ORDER BY distance
+            LIMIT :top_k
+        ) nearest
+        WHERE -distance >= :threshold
+        ORDER BY distance
+    """).bindparams(*params)
+
+
+# Search statements are built once with typed bind parameters so the SQL text
+# is identical on every call and prepared statements are reused. Embeddings
+# are bound as numpy arrays and sent by pgvector's binary codec.
+# Keyed by (binary_rerank, include_metadata).
+SEARCH_STMTS = {
+    (binary_rerank, include_metadata): _search_stmt(
+        CHUNK_COLUMNS if include_metadata else PROMPT_COLUMNS,
+        binary_rerank
+    )
+    for binary_rerank in (False, True)
+    for include_metadata in (False, True)
+}
+
+# Top-k per query for a batch of query embeddings. The embeddings are bound as
+# one halfvec[] and unnested; each runs its own ordered index scan through the
+# LATERAL subquery, and the whole batch shares one statement and round trip.
+BATCH_SEARCH_STMT = text("""
+    SELECT
+        q.qid,
+        nearest.id,
+        nearest.document_id,
+        nearest.chunk_text,
+        nearest.chunk_index,
+        nearest.meta_data,
+        nearest.created_at,
+        -nearest.distance AS similarity
+    FROM unnest(CAST(:query_embeddings AS halfvec[])) WITH ORDINALITY AS q(qvec, qid)
+    CROSS JOIN LATERAL (
+        SELECT
+            id,
+            document_id,
+            chunk_text,
+            chunk_index,
+            meta_data,
+            created_at,
+            embedding <#> q.qvec AS distance
+        FROM document_chunks
+        ORDER BY distance
+        LIMIT :top_k
+    ) nearest
+    WHERE -nearest.distance >= :threshold
+    ORDER BY q.qid, nearest.distance
+""").bindparams(
+    bindparam("query_embeddings"),
+    bindparam("threshold", type_=Float),
+    bindparam("top_k", type_=Integer),
+)
+
+# Largest hnsw.ef_search pgvector accepts; an HNSW scan returns at most this
+# many rows, so larger top_k values are effectively capped here
+HNSW_EF_SEARCH_MAX = 1000
+
+# Transaction-local search settings, applied in one round trip. Bitmap scans
+# are disabled so the planner keeps the ordered HNSW index scan.
+SEARCH_OPTIONS_STMT = text(
+    "SELECT set_config('hnsw.ef_search', :ef_search, true), "
+    "set_config('enable_bitmapscan', 'off', true)"
+).bindparams(bindparam("ef_search", type_=String))
+
+
+# Lightweight chunk row returned by raw similarity queries
+ChunkData = namedtuple(
+    "ChunkData",
+    ["id", "document_id", "chunk_text", "chunk_index", "meta_data", "created_at"]
+)
+
+
+def _chunk_from_row(row) -> ChunkData:
+    """Build ChunkData from a result mapping; columns not selected are left empty."""
+    return ChunkData(
+        id=row["id"],
+        document_id=row["document_id"],
+        chunk_text=row["chunk_text"],
+        chunk_index=row.get("chunk_index"),
+        meta_data=row.get("meta_data") or {},
+        created_at=row.get("created_at")
+    )
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    """Scale an embedding, or each row of an embedding matrix, to unit L2 norm."""
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    return vectors / (np.linalg.norm(vectors, axis=-1, keepdims=True) + 1e-12)
+
 
 class VectorService:
     """Service for vector similarity search using pgvector."""
 
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, llm_service: Optional[LLMService] = None):
         """Initialize vector service."""
         self.db = db
-        self.llm_service = LLMService()
+        self.llm_service = llm_service or LLMService()
 
     async def add_document_chunks(
         self,
         document_id: int,
         chunks: List[str],
-        metadata: List[dict] = None
-    ) -> List[DocumentChunk]:
+        metadata: List[dict] = None,
+        batch_size: int = None
+    ) -> int:
         """
         Add document chunks with embeddings to vector store.
 
@@ -35,104 +187,188 @@ class VectorService:
             document_id: ID of parent document
             chunks: List of text chunks
             metadata: Optional metadata for each chunk
+            batch_size: Rows per INSERT batch, defaults to settings.chunk_insert_batch_size
 
         Returns:
-            List of created DocumentChunk objects
+            Number of chunks added
         """
         try:
             # Generate embeddings for all chunks
             embeddings = await self.llm_service.generate_embeddings(chunks)
 
-            # Create DocumentChunk objects
-            chunk_objects = []
-            for idx, (chunk_text, embedding) in enumerate(zip(chunks, embeddings)):
-                chunk_meta = metadata[idx] if metadata and idx < len(metadata) else {}
-
-                chunk = DocumentChunk(
-                    document_id=document_id,
-                    chunk_text=chunk_text,
-                    chunk_index=idx,
-                    embedding=embedding,
-                    metadata=chunk_meta
-                )
-                self.db.add(chunk)
-                chunk_objects.append(chunk)
+            count = await self.add_document_chunks_with_embeddings(
+                document_id=document_id,
+                pairs=list(zip(chunks, embeddings)),
+                metadata=metadata,
+                batch_size=batch_size
+            )
 
             await self.db.commit()
-            logger.info(f"Added {len(chunk_objects)} chunks for document {document_id}")
-
-            return chunk_objects
+            return count
 
         except Exception as e:
             await self.db.rollback()
             logger.error(f"Error adding document chunks: {e}")
             raise
 
+    async def add_document_chunks_with_embeddings(
+        self,
+        document_id: int,
+        pairs: List[Tuple[str, np.ndarray]],
+        metadata: List[dict] = None,
+        batch_size: int = None
+    ) -> int:
+        """
+        Insert pre-embedded document chunks in bulk.
+
+        Each batch is a single executemany of one fixed INSERT statement, so
+        asyncpg prepares it once and pipelines the rows instead of issuing a
+        round trip per chunk. Does not commit; the caller owns the transaction.
+
+        Args:
+            document_id: ID of parent document
+            pairs: List of (chunk_text, embedding) tuples in chunk order
+            metadata: Optional metadata for each chunk
+            batch_size: Rows per INSERT batch, defaults to settings.chunk_insert_batch_size
+
+        Returns:
+            Number of chunks added
+        """
+        if not pairs:
+            return 0
+
+        # Normalize and convert to the halfvec storage precision in one
+        # vectorized pass; the codec then reuses each float16 row as-is
+        embeddings = _normalize(np.stack([embedding for _, embedding in pairs])).astype(np.float16)
+
+        rows = [
+            {
+                "document_id": document_id,
+                "chunk_index": idx,
+                "chunk_text": chunk_text,
+                "embedding": embeddings[idx],
+                "meta_data": metadata[idx] if metadata and idx < len(metadata) else {},
+            }
+            for idx, (chunk_text, _) in enumerate(pairs)
+        ]
+
+        batch_size = batch_size or settings.chunk_insert_batch_size
+        for start in range(0, len(rows), batch_size):
+            await self.db.execute(insert(DocumentChunk), rows[start:start + batch_size])
+
+        logger.info(f"Added {len(rows)} chunks for document {document_id}")
+
+        return len(rows)
+
+    async def _set_search_options(self, top_k: int, ef_search: int = None):
+        """
+        Set hnsw.ef_search and disable bitmap scans for the current transaction.
+
+        HNSW returns at most ef_search rows, so the default candidate list
+        grows with top_k to keep recall stable for larger result sets. The
+        value is clamped to pgvector's accepted range of 1 to
+        HNSW_EF_SEARCH_MAX.
+
+        Args:
+            top_k: Number of results the search will return
+            ef_search: HNSW candidate list size, defaults to
+                max(settings.hnsw_ef_search, top_k * settings.hnsw_ef_search_factor)
+        """
+        if not ef_search:
+            ef_search = max(settings.hnsw_ef_search, top_k * settings.hnsw_ef_search_factor)
+        ef_search = min(HNSW_EF_SEARCH_MAX, max(1, ef_search))
+
+        await self.db.execute(SEARCH_OPTIONS_STMT, {"ef_search": str(ef_search)})
+
     async def similarity_search(
         self,
         query: str,
         top_k: int = 5,
-        similarity_threshold: float = None
+        similarity_threshold: float = None,
+        ef_search: int = None
     ) -> List[Tuple[DocumentChunk, float]]:
         """
         Search for similar document chunks using cosine similarity.
 
+        Similarity is computed as the inner product of unit-norm vectors.
+
         Args:
             query: Search query
             top_k: Number of results to return
             similarity_threshold: Minimum similarity score (0-1)
+            ef_search: HNSW candidate list size for this query
 
         Returns:
             List of (DocumentChunk, similarity_score) tuples
         """
+        # Generate query embedding (cached for repeated queries)
+        query_embedding = await self.llm_service.embed_query(query)
+
+        return await self.similarity_search_by_vector(
+            query_embedding,
+            top_k=top_k,
+            similarity_threshold=similarity_threshold,
+            ef_search=ef_search
+        )
+
+    async def similarity_search_by_vector(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        similarity_threshold: float = None,
+        ef_search: int = None,
+        include_metadata: bool = True
+    ) -> List[Tuple[ChunkData, float]]:
+        """
+        Search for document chunks similar to a precomputed query embedding.
+
+        Args:
+            query_embedding: Query embedding vector
+            top_k: Number of results to return
+            similarity_threshold: Minimum similarity score (0-1)
+            ef_search: HNSW candidate list size for this query
+            include_metadata: Also return chunk_index, meta_data and
+                created_at; without them only the columns a prompt needs
+                are read
+
+        Returns:
+            List of (ChunkData, similarity_score) tuples
+        """
         try:
-            # Generate query embedding
-            query_embeddings = await self.llm_service.generate_embeddings([query])
-            query_embedding = query_embeddings[0]
+            query_embedding = _normalize(query_embedding)
 
             # Use similarity threshold from settings if not provided
             threshold = similarity_threshold or settings.rag_similarity_threshold
 
+            params = {
+                "query_embedding": query_embedding,
+                "threshold": threshold,
+                "top_k": top_k
+            }
+
             # Perform similarity search using pgvector
-            # Using cosine similarity: 1 - cosine_distance
-            # Format embedding as PostgreSQL array
-            embedding_str = "[" + ",".join(map(str, query_embedding)) + "]"
-
-            query_sql = f"""
-                SELECT
-                    id,
-                    document_id,
-                    chunk_text,
-                    chunk_index,
-                    meta_data,
-                    created_at,
-                    1 - (embedding <=> '{embedding_str}'::vector) as similarity
-                FROM document_chunks
-                WHERE 1 - (embedding <=> '{embedding_str}'::vector) >= {threshold}
-                ORDER BY embedding <=> '{embedding_str}'::vector
-                LIMIT {top_k}
-            """
-
-            result = await self.db.execute(text(query_sql))
-
-            rows = result.fetchall()
-
-            # Construct results - use dict instead of ORM model to avoid greenlet issues
-            results = []
-            for row in rows:
-                # Create a simple object-like dict
-                class ChunkData:
-                    def __init__(self, row_data):
-                        self.id = row_data[0]
-                        self.document_id = row_data[1]
-                        self.chunk_text = row_data[2]
-                        self.chunk_index = row_data[3]
-                        self.meta_data = row_data[4] or {}
-                        self.created_at = row_data[5]
-
-                chunk = ChunkData(row)
-                similarity = float(row[6])  # similarity is the 7th column
-                results.append((chunk, similarity))
+            if settings.binary_rerank:
+                # The binary index scan returns at most ef_search rows, so the
+                # candidate count shares its cap
+                candidates = min(HNSW_EF_SEARCH_MAX, max(top_k, settings.binary_rerank_candidates))
+                params["candidates"] = candidates
+                await self._set_search_options(
+                    candidates,
+                    ef_search or max(settings.hnsw_ef_search, candidates)
+                )
+            else:
+                await self._set_search_options(top_k, ef_search)
+
+            stmt = SEARCH_STMTS[settings.binary_rerank, include_metadata]
+            result = await self.db.execute(stmt, params)
+
+            rows = result.mappings().all()
+
+            # Construct results - use plain objects instead of ORM model to avoid greenlet issues
+            results = [
+                (_chunk_from_row(row), float(row["similarity"]))
+                for row in rows
+            ]
 
             logger.info(f"Found {len(results)} similar chunks for query")
             return results
@@ -141,6 +377,91 @@ class VectorService:
             logger.error(f"Error in similarity search: {e}")
             raise
 
+    async def similarity_search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        similarity_threshold: float = None
+    ) -> List[List[Tuple[ChunkData, float]]]:
+        """
+        Search top-k chunks for several queries in one SQL round trip.
+
+        Queries are embedded concurrently (through the query embedding cache
+        and batcher) and searched together with batch_search.
+
+        Args:
+            queries: Search queries
+            top_k: Number of results to return per query
+            similarity_threshold: Minimum similarity score (0-1)
+
+        Returns:
+            One list of (ChunkData, similarity_score) tuples per query,
+            in the same order as queries
+        """
+        query_vecs = await asyncio.gather(
+            *(self.llm_service.embed_query(query) for query in queries)
+        )
+
+        return await self.batch_search(
+            list(query_vecs),
+            top_k=top_k,
+            similarity_threshold=similarity_threshold
+        )
+
+    async def batch_search(
+        self,
+        query_vecs: List[np.ndarray],
+        top_k: int = 5,
+        similarity_threshold: float = None
+    ) -> List[List[Tuple[ChunkData, float]]]:
+        """
+        Search top-k chunks for several query embeddings in one SQL round trip.
+
+        The embeddings are sent as a single halfvec[] parameter and searched
+        through a LATERAL join, so every query uses the HNSW index.
+
+        Args:
+            query_vecs: Query embedding vectors
+            top_k: Number of results to return per query
+            similarity_threshold: Minimum similarity score (0-1)
+
+        Returns:
+            One list of (ChunkData, similarity_score) tuples per query vector,
+            in the same order as query_vecs
+        """
+        if not query_vecs:
+            return []
+
+        try:
+            threshold = similarity_threshold or settings.rag_similarity_threshold
+
+            # HalfVector elements keep asyncpg from reading each array row as
+            # a nested dimension; the codec sends them in binary
+            query_matrix = _normalize(np.stack(query_vecs))
+            query_embeddings = [HalfVector(vec) for vec in query_matrix]
+
+            await self._set_search_options(top_k)
+            result = await self.db.execute(
+                BATCH_SEARCH_STMT,
+                {
+                    "query_embeddings": query_embeddings,
+                    "threshold": threshold,
+                    "top_k": top_k
+                }
+            )
+
+            # WITH ORDINALITY numbers the queries from 1
+            results = [[] for _ in query_vecs]
+            for row in result.mappings():
+                results[row["qid"] - 1].append((_chunk_from_row(row), float(row["similarity"])))
+
+            logger.info(f"Batch search returned {sum(map(len, results))} chunks for {len(query_vecs)} queries")
+            return results
+
+        except Exception as e:
+            logger.error(f"Error in batch similarity search: {e}")
+            raise
+
     async def delete_document_chunks(self, document_id: int):
         """
         Delete all chunks for a document.
@@ -149,16 +470,13 @@ class VectorService:
             document_id: ID of document
         """
         try:
+            # Single bulk DELETE; no rows (or embeddings) are loaded
             result = await self.db.execute(
-                select(DocumentChunk).where(DocumentChunk.document_id == document_id)
+                delete(DocumentChunk).where(DocumentChunk.document_id == document_id)
             )
-            chunks = result.scalars().all()
-
-            for chunk in chunks:
-                await self.db.delete(chunk)
 
             await self.db.commit()
-            logger.info(f"Deleted {len(chunks)} chunks for document {document_id}")
+            logger.info(f"Deleted {result.rowcount} chunks for document {document_id}")
 
         except Exception as e:
             await self.db.rollback()